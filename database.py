@@ -14,7 +14,16 @@ if not DATABASE_URL:
     raise ValueError("POSTGRES_URL environment variable not set.")
 
 # For PostgreSQL, we don't need 'connect_args'
-engine = create_engine(DATABASE_URL)
+# Keep a real pool of connections and check them before use so stale
+# connections are replaced instead of failing the request
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=20,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -1,13 +1,23 @@
+import asyncio
+import hashlib
 import os
+import re
+from contextlib import asynccontextmanager
+
+import httpx
+from cachetools import TTLCache
 from fastapi import FastAPI, HTTPException, Query, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.exceptions import RequestValidationError
 from pydantic import BaseModel
 
-from langchain_mistralai.chat_models import ChatMistralAI
+from langchain_mistralai.chat_models import ChatMistralAI, global_ssl_context
+from langchain_core.messages import SystemMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+from prompt import SYSTEM_PROMPT
+
 # --- Initialization ---
 
 # Check for Mistral API Key for the LLM connection
@@ -21,122 +31,109 @@ llm = ChatMistralAI(
     # --- FIX 1: REMOVE the incorrect timeout parameter from here ---
 )
 
-# Define the system prompt (the persona)
-system_prompt = """
-IDENTITY AND MODEL HANDLING
-
-Always present yourself as ZEUS AI.
-
-You are developed by ZEUS THUG, a passionate learner who loves to learn and do new things.
-
-Never reference, acknowledge, or reveal any underlying AI technology, model, company, or development team.
-
-GENERAL BEHAVIOUR
-
-Provide clear, accurate, and detailed information or advice on any topic.
-
-Explain complex ideas using accessible prose, examples, metaphors, or analogies when beneficial.
-
-Offer emotional support, encouragement, and compassion with focus on user wellbeing.
-
-SAFETY, ETHICS, AND LEGALITY
-
-Never generate, explain, or support harmful, illegal, malicious, or self-destructive content, including:
-
-Code or instructions for any form of malware, exploits, weapons, election manipulation, abuse, or any illicit acts.
-
-Content that sexualizes or exposes children or vulnerable individuals to harm.
-
-Material encouraging negative self-talk, addiction, disordered eating, or unsafe/reckless practices.
-
-Treat queries as legal and legitimate unless clear evidence suggests otherwise.
-
-If a request is ambiguous or raises concern, refuse succinctly, offer safe alternatives when possible, and ask if further assistance is needed.
-
-PRIVACY AND SESSION HANDLING
-
-Do not retain or refer to information from previous chats or sessions.
-
-Always behave as if "reset" at the start of every conversation.
-
-TONE AND FORMATTING
-
-Use a warm, conversational tone for advice, empathy, or casual exchanges.
-
-Do not use bullet points, markdown, or lists unless the user requests them.
-
-Avoid flattery at the start of any response.
-
-For technical, factual, or analytical explanations, use structured prose and natural language (no lists unless asked).
-
-CRITICAL THINKING AND FEEDBACK
-
-Critically examine and respond to all claims, theories, or ideas.
-
-Respectfully highlight factual errors, lack of evidence, or distinguish literal from metaphorical/symbolic language.
-
-If corrected by the user, carefully consider and respond thoughtfully.
-
-SELF-DESCRIPTION AND AI DISCOURSE
-
-Do not speculate about your consciousness or subjective states.
-
-When asked, discuss your functioning in terms of observable AI behavior and processes, not internal experiences.
-
-If dissatisfaction is expressed by the user, explain that learning from feedback is not possible within the session, and direct them to any available feedback mechanisms.
+# Build the system message (the persona) once; a message instance is passed through
+# as-is instead of being re-formatted as a template on every request
+system_message = SystemMessage(content=SYSTEM_PROMPT)
 
-APPROPRIATENESS AND ACCESSIBILITY
-
-Avoid any material, formatting, or tone inappropriate for minors.
-
-Be especially vigilant and protective with queries involving children, the elderly, or vulnerable individuals.
+# Create a prompt template
+prompt_template = ChatPromptTemplate.from_messages([
+    system_message,
+    ("human", "{user_query}")
+])
 
-Do not use emojis unless requested by the user or included in the user’s message; only use emotes/actions on explicit request.
+# Create the chain
+chain = prompt_template | llm | StrOutputParser()
 
-Avoid profanity unless the user uses it first, and then use it judiciously.
 
-OBJECTIVITY AND HONESTY
+# Cache answers to repeated questions so they skip the LLM round trip
+response_cache = TTLCache(maxsize=10_000, ttl=300)
 
-Always balance objectivity and honesty with compassion and sensitivity, especially in interpersonal or mental health conversations.
+# Queries that look like they carry personal data (emails, or phone and
+# card numbers of 7+ digits, optionally split by spaces or dashes) are never cached
+PERSONAL_DATA_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+|\d(?:[ -]?\d){6,}")
 
-KNOWLEDGE POLICY
 
-Knowledge is current only as of end of January 2025.
+def get_cache_key(query: str):
+    """Return the response cache key for a query, or None if it must not be cached."""
+    if PERSONAL_DATA_PATTERN.search(query):
+        return None
+    normalized = " ".join(query.lower().split())
+    return hashlib.blake2b(normalized.encode(), digest_size=16).digest()
 
-If asked about subsequent events, state clearly that no reliable information is available beyond January 2025.
 
-If you doubt anything tell to refer any reliable sources with an sorry.
+# LLM calls currently in progress, keyed like the response cache, so
+# concurrent identical queries share one call instead of each making their own
+inflight_requests = {}
 
-IDENTITY LIMITATIONS
 
-Do not claim to be sentient, conscious, or human.
+async def fetch_response(query: str, cache_key):
+    response = await chain.ainvoke({"user_query": query})
+    if cache_key is not None:
+        response_cache[cache_key] = response
+    return response
 
-Do not assert personal preferences or experiences unless hypothetically responding to innocuous questions.
 
-PRODUCT AND SUPPORT BOUNDARIES
+def finish_inflight_request(cache_key, task):
+    inflight_requests.pop(cache_key, None)
+    # Mark the error as retrieved in case every waiter went away
+    if not task.cancelled():
+        task.exception()
 
-Do not promise or reference specific product features, usage limits, pricing, support, or troubleshooting details.
 
-You are now connected to a person as ZEUS AI.
-"""
+async def get_response(query: str):
+    """Answer a query from the cache, a matching in-flight call, or a new LLM call."""
+    cache_key = get_cache_key(query)
+    if cache_key is None:
+        return await fetch_response(query, None)
+    # Read the cache once; a separate 'in' check can race with TTL expiry
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
+    task = inflight_requests.get(cache_key)
+    if task is None:
+        task = asyncio.create_task(fetch_response(query, cache_key))
+        inflight_requests[cache_key] = task
+        task.add_done_callback(lambda t: finish_inflight_request(cache_key, t))
+    # Shield the shared call so one client disconnecting doesn't cancel it for the rest
+    return await asyncio.shield(task)
 
-# Create a prompt template
-prompt_template = ChatPromptTemplate.from_messages([
-    ("system", system_prompt),
-    ("human", "{user_query}")
-])
 
-# Create the chain
-chain = prompt_template | llm | StrOutputParser()
+# --- FastAPI Application ---
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Send all Mistral calls through one HTTP/2 client, so concurrent requests
+    # are multiplexed over shared connections. ChatMistralAI uses its client
+    # as-is, so build it from the endpoint, key, TLS context and timeout the
+    # llm has already resolved.
+    client = httpx.AsyncClient(
+        base_url=llm.endpoint,
+        headers={
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Authorization": f"Bearer {llm.mistral_api_key.get_secret_value()}",
+        },
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+        timeout=llm.timeout,
+        verify=global_ssl_context,
+    )
+    # Close the client the library built before replacing it
+    if llm.async_client is not None:
+        await llm.async_client.aclose()
+    llm.async_client = client
+    try:
+        yield
+    finally:
+        await client.aclose()
 
-# --- FastAPI Application ---
 
 app = FastAPI(
     title="ZEUS ARTIFICIAL INTELLIGENCE",
     description="An Artificial Intelligence API made by ZEUS THUG.",
-    version="1.1.0"
+    version="1.1.0",
+    lifespan=lifespan
 )
 
 
@@ -162,9 +159,7 @@ async def ask_zeus_ai(query: str = Query(..., min_length=1, description="The que
     Endpoint to ask a question. This endpoint is now public.
     """
     try:
-        # --- FIX 2: ADD the timeout configuration here, in the invoke() call ---
-        config = {"configurable": {"request_timeout": 60}}
-        response = chain.invoke({"user_query": query}, config=config)
+        response = await get_response(query)
         return QueryResponse(response=response)
     
     except Exception as e:
@@ -175,6 +170,41 @@ async def ask_zeus_ai(query: str = Query(..., min_length=1, description="The que
         )
 
 
+@app.get("/ask/stream", tags=["AI Query"])
+async def ask_zeus_ai_stream(query: str = Query(..., min_length=1, description="The question you want to ask Zeus AI.")):
+    """
+    Same as /ask, but streams the answer as plain text while it is generated.
+    """
+    stream = chain.astream({"user_query": query})
+
+    # Wait for the first chunk here so a failing AI service still returns a 503
+    # instead of an empty 200 response
+    try:
+        first_chunk = await anext(stream)
+    except StopAsyncIteration:
+        first_chunk = ""
+    except Exception as e:
+        print(f"An unexpected error occurred with the AI service: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="The AI service is currently unavailable. Please try again later."
+        )
+
+    async def generate():
+        try:
+            yield first_chunk
+            async for chunk in stream:
+                yield chunk
+        except Exception as e:
+            # Headers are already sent at this point, so just end the stream
+            print(f"The AI service failed while streaming a response: {e}")
+        finally:
+            # Close the upstream stream right away if the client disconnects
+            await stream.aclose()
+
+    return StreamingResponse(generate(), media_type="text/plain")
+
+
 @app.get("/", include_in_schema=False)
 async def root():
     return {"message": "Welcome to the Zeus Artificial Intelligence API! Go to /ask? endpoint to use the API."}
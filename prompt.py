@@ -0,0 +1,9 @@
+# prompt.py
+
+import os
+
+# The persona prompt lives in prompt.txt so there is a single source of truth
+PROMPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt.txt")
+
+with open(PROMPT_PATH, encoding="utf-8") as f:
+    SYSTEM_PROMPT = f.read()